@@ -3,10 +3,14 @@
 Simple I2C Bus Scanner - Check if BME280 is wired correctly
 """
 
+import sys
 import board
 import busio
 import time
 
+# Pass --full to scan every address instead of just the BME280 addresses
+full_scan = "--full" in sys.argv[1:]
+
 print("=" * 70)
 print("I2C Bus Scanner for BME280")
 print("=" * 70)
@@ -29,19 +33,57 @@ except Exception as e:
     exit(1)
 
 # Scan for devices
-print("\nScanning I2C bus...")
-print("This may take a few seconds...\n")
+if full_scan:
+    print("\nScanning full I2C bus...")
+    print("This may take a few seconds...\n")
+else:
+    print("\nProbing BME280 addresses (0x76, 0x77)...")
+    print("Use --full to scan the whole bus\n")
+
+retried_slow = False
 
 for attempt in range(3):
     if attempt > 0:
         print(f"\nRetry {attempt}...")
         time.sleep(1)
     
-    while not i2c.try_lock():
-        pass
+    # Long wires or weak pull-ups may only work at standard mode (100 kHz)
+    if attempt == 1:
+        print("Switching I2C bus to 100 kHz...")
+        try:
+            i2c.deinit()
+            i2c = busio.I2C(board.SCL, board.SDA, frequency=100_000)
+            retried_slow = True
+        except Exception as e:
+            print(f"✗ Failed to recreate I2C bus at 100 kHz: {e}")
+            break
+    
+    # Wait up to 1 second for the bus rather than spinning a core
+    for _ in range(100):
+        if i2c.try_lock():
+            break
+        time.sleep(0.01)
+    else:
+        print("✗ Timed out waiting for I2C bus lock")
+        print("  → Another process may be using the bus; close it and retry")
+        exit(1)
     
     try:
-        devices = i2c.scan()
+        if full_scan:
+            devices = i2c.scan()
+        else:
+            devices = []
+            for addr in (0x76, 0x77):
+                try:
+                    i2c.writeto(addr, b"")
+                    devices.append(addr)
+                except OSError:
+                    # Some adapters reject zero-length writes; retry with a 1-byte read
+                    try:
+                        i2c.readfrom_into(addr, bytearray(1))
+                        devices.append(addr)
+                    except OSError:
+                        pass
         
         if devices:
             print(f"✓ Found {len(devices)} I2C device(s):")
@@ -83,15 +125,22 @@ print("   - Verify you're using the correct GPIO pins (2 and 3)")
 print("\n2. Check power:")
 print("   - BME280 needs 3.3V (NOT 5V - may damage sensor)")
 print("   - Verify power LED on BME280 module is lit (if present)")
-print("\n3. Try with i2cdetect command:")
+print("\n3. Check bus speed:")
+if retried_slow:
+    print("   - This tool already retried at 100 kHz")
+    print("   - If the sensor still isn't found, shorten the wires and check pull-ups")
+else:
+    print("   - Long wires or weak pull-ups may need standard mode (100 kHz)")
+    print("   - Shorten the wires and check pull-ups")
+print("\n4. Try with i2cdetect command:")
 print("   Run: i2cdetect -y 1")
 print("   Should show device at 76 or 77")
-print("\n4. Check if I2C is enabled:")
+print("\n5. Check if I2C is enabled:")
 print("   Run: sudo raspi-config")
 print("   → Interface Options → I2C → Enable")
-print("\n5. If you just connected the sensor:")
+print("\n6. If you just connected the sensor:")
 print("   - Power cycle: sudo reboot")
-print("\n6. Test with a multimeter:")
+print("\n7. Test with a multimeter:")
 print("   - Check continuity of SDA and SCL connections")
 print("   - Verify 3.3V at sensor VCC pin")
 print("=" * 70)
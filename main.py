@@ -3,11 +3,29 @@ Meshcore Telemetry Reader for Heltec V3 via USB Serial with BME280 Sensor
 """
 
 import asyncio
+import atexit
+import gzip
 import logging
+import logging.handlers
+import os
+import platform
+import queue
+import shutil
+import signal
+import struct
+import sys
 import time
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 from meshcore import MeshCore, SerialConnection, ConnectionManager, EventType
+from meshcore.commands import DeviceCommands
+
+# Use the faster libuv-based event loop when it is installed
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Create logs directory
 logs_dir = Path("logs")
@@ -16,18 +34,123 @@ logs_dir.mkdir(exist_ok=True)
 # Create timestamped log file
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 log_file = logs_dir / f"meshcore_{timestamp}.log"
+sample_file = logs_dir / f"bme280_{timestamp}.bin"
 
-# Configure logging with both file and console output
-logging.basicConfig(
-    level=logging.DEBUG,  # More verbose
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler()
-    ]
+# Set MESHCORE_DEBUG=1 for verbose debug logging
+debug_logging = os.environ.get("MESHCORE_DEBUG") == "1"
+
+# Event and sensor displays are only printed when stdout is a terminal.
+# MESHCORE_QUIET=1 always suppresses them, MESHCORE_QUIET=0 always prints them.
+quiet_setting = os.environ.get("MESHCORE_QUIET")
+if quiet_setting in ("0", "1"):
+    console_display = quiet_setting == "0"
+else:
+    console_display = sys.stdout.isatty()
+
+
+class CachedTimeFormatter(logging.Formatter):
+    """Formatter that only calls strftime once per second of log records."""
+    # (second, text) kept in one attribute so threads sharing the formatter
+    # never see a second paired with another second's text
+    _cache = (None, "")
+    
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        cached_second, text = self._cache
+        if second != cached_second:
+            text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+            self._cache = (second, text)
+        return f"{text},{int(record.msecs):03d}"
+
+
+class CompressedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating log handler that gzips rotated files and buffers writes.
+    
+    Writes go through a 64 KB buffer and are only flushed per record for
+    errors; call flush() periodically. Rotation uses a running byte count, which avoids
+    the seek (and implicit flush) RotatingFileHandler does on every record.
+    """
+    
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._gzip_rotator
+        self._size = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+    
+    @staticmethod
+    def _gzip_rotator(source, dest):
+        with open(source, 'rb') as sf, gzip.open(dest, 'wb') as df:
+            shutil.copyfileobj(sf, df)
+        os.remove(source)
+    
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=65536,
+                    encoding=self.encoding, errors=self.errors)
+    
+    def doRollover(self):
+        super().doRollover()
+        self._size = 0
+    
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+            # Count encoded bytes; log lines include multi-byte characters (✓, °, →)
+            if msg.isascii():
+                size = len(msg)
+            else:
+                size = len(msg.encode(self.encoding or 'utf-8', self.errors or 'strict'))
+            if self.maxBytes > 0 and self._size + size >= self.maxBytes:
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(msg)
+            self._size += size
+            # Get errors onto disk straight away
+            if record.levelno >= logging.ERROR:
+                self.stream.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+# Configure logging with both file and console output. Records are handed to a
+# background listener thread so file writes never block the event loop.
+log_queue = queue.SimpleQueue()
+log_formatter = CachedTimeFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+file_handler = CompressedRotatingFileHandler(
+    log_file, mode='a', maxBytes=10 * 1024 * 1024, backupCount=10, encoding='utf-8'
+)
+file_handler.setFormatter(log_formatter)
+# Batch records in memory ahead of the file; errors are pushed through and flushed immediately
+memory_handler = logging.handlers.MemoryHandler(
+    capacity=512, flushLevel=logging.ERROR, target=file_handler, flushOnClose=True
 )
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(log_formatter)
+# Console already gets the formatted displays below, so only echo problems there
+stream_handler.setLevel(logging.DEBUG if debug_logging else logging.WARNING)
+log_listener = logging.handlers.QueueListener(
+    log_queue, memory_handler, stream_handler, respect_handler_level=True
+)
+root_logger = logging.getLogger()
+root_logger.setLevel(logging.DEBUG if debug_logging else logging.INFO)
+root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+log_listener.start()
+atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
-logger.info(f"Logging to: {log_file}")
+logger.info("Logging to: %s", log_file)
+
+
+def flush_log_file():
+    """Push batched log records to the log file and flush it to disk."""
+    memory_handler.flush()
+    # StreamHandler.flush() doesn't catch errors (e.g. a full SD card)
+    try:
+        file_handler.flush()
+    except OSError as e:
+        logger.error("Could not flush log file: %s", e)
+
 
 # BME280 sensor setup
 bme280_sensor = None
@@ -37,7 +160,7 @@ try:
     import adafruit_bme280.advanced as adafruit_bme280
     
     logger.info("Initializing BME280 sensor...")
-    logger.info(f"Board detected: {board.board_id if hasattr(board, 'board_id') else 'Unknown'}")
+    logger.info("Board detected: %s", board.board_id if hasattr(board, 'board_id') else 'Unknown')
     
     # Create I2C interface
     try:
@@ -46,75 +169,281 @@ try:
         logger.debug("I2C interface created using board.I2C()")
     except Exception as e:
         # Fallback: create I2C explicitly
-        logger.debug(f"board.I2C() failed: {e}, trying explicit busio.I2C()")
+        logger.debug("board.I2C() failed: %s, trying explicit busio.I2C()", e)
         i2c = busio.I2C(board.SCL, board.SDA)
-        logger.debug(f"I2C interface created on SCL={board.SCL}, SDA={board.SDA}")
+        logger.debug("I2C interface created on SCL=%s, SDA=%s", board.SCL, board.SDA)
     
-    # Scan for I2C devices
-    logger.debug("Scanning I2C bus for devices...")
-    while not i2c.try_lock():
-        pass
+    # Probe the two BME280 addresses directly instead of scanning the whole bus
+    logger.debug("Probing I2C bus for BME280 at 0x76/0x77...")
+    found_addresses = []
+    for _ in range(100):
+        if i2c.try_lock():
+            break
+        time.sleep(0.01)
+    else:
+        raise TimeoutError("Timed out waiting for I2C bus lock")
     try:
-        devices = i2c.scan()
-        if devices:
-            logger.info(f"Found {len(devices)} I2C device(s): {[hex(d) for d in devices]}")
-        else:
-            logger.warning("No I2C devices detected on the bus!")
-            logger.warning("Check BME280 wiring:")
-            logger.warning("  VCC → 3.3V, GND → Ground, SDA → GPIO2 (Pin 3), SCL → GPIO3 (Pin 5)")
+        for address in [0x76, 0x77]:
+            try:
+                i2c.writeto(address, b"")
+                found_addresses.append(address)
+            except OSError:
+                # Some adapters reject zero-length writes; retry with a 1-byte read
+                try:
+                    i2c.readfrom_into(address, bytearray(1))
+                    found_addresses.append(address)
+                except OSError:
+                    logger.debug("No response at 0x%02x", address)
     finally:
         i2c.unlock()
     
-    # Try both common I2C addresses (0x76 and 0x77)
-    for address in [0x76, 0x77]:
+    # Only initialize at addresses that answered, falling back to trying
+    # both if the probe found nothing.
+    if not found_addresses:
+        logger.warning("No BME280 detected at 0x76 or 0x77!")
+        logger.warning("Check BME280 wiring:")
+        logger.warning("  VCC → 3.3V, GND → Ground, SDA → GPIO2 (Pin 3), SCL → GPIO3 (Pin 5)")
+    candidates = found_addresses or [0x76, 0x77]
+    
+    for address in candidates:
         try:
-            logger.debug(f"Attempting to initialize BME280 at address 0x{address:02x}")
+            logger.debug("Attempting to initialize BME280 at address 0x%02x", address)
             bme280_sensor = adafruit_bme280.Adafruit_BME280_I2C(i2c, address=address)
             bme280_sensor.sea_level_pressure = 1013.25  # Standard sea level pressure
-            logger.info(f"✓ BME280 sensor initialized successfully at address 0x{address:02x}")
+            logger.info("✓ BME280 sensor initialized successfully at address 0x%02x", address)
             
             # Test read
             test_temp = bme280_sensor.temperature
-            logger.info(f"  Temperature reading: {test_temp:.2f}°C")
+            logger.info("  Temperature reading: %.2f°C", test_temp)
             break
         except ValueError as e:
-            logger.debug(f"BME280 not at 0x{address:02x}: {e}")
+            logger.debug("BME280 not at 0x%02x: %s", address, e)
             continue
         except Exception as e:
-            logger.debug(f"Error at 0x{address:02x}: {type(e).__name__}: {e}")
+            logger.debug("Error at 0x%02x: %s: %s", address, type(e).__name__, e)
             continue
     
     if bme280_sensor is None:
         raise Exception("BME280 not found at addresses 0x76 or 0x77. Check wiring and run: python check_i2c_wiring.py")
         
 except ImportError as e:
-    logger.error(f"BME280 libraries not installed: {e}")
+    logger.error("BME280 libraries not installed: %s", e)
     logger.error("Run: pip install adafruit-circuitpython-bme280 adafruit-blinka")
 except Exception as e:
-    logger.warning(f"BME280 sensor not available: {e}")
+    logger.warning("BME280 sensor not available: %s", e)
     logger.warning("Continuing without BME280 sensor...")
     logger.warning("Run 'python check_i2c_wiring.py' for detailed diagnostics")
 
 
+def read_bme280_burst(sensor):
+    """Read temperature, humidity and pressure in one burst from the data registers.
+    
+    The driver's properties each trigger their own I2C reads. This reads all
+    eight data bytes (0xF7-0xFE) at once and applies the driver's calibration
+    and compensation formulas. Returns (temperature_c, humidity, pressure_hpa).
+    """
+    if sensor.mode != adafruit_bme280.MODE_NORMAL:
+        sensor.mode = adafruit_bme280.MODE_FORCE
+        # Wait for conversion to complete
+        while sensor._get_status() & 0x08:
+            time.sleep(0.002)
+    
+    buf = sensor._read_register(0xF7, 8)
+    adc_p = ((buf[0] << 16) | (buf[1] << 8) | buf[2]) / 16  # lowest 4 bits get dropped
+    adc_t = ((buf[3] << 16) | (buf[4] << 8) | buf[5]) / 16
+    adc_h = float((buf[6] << 8) | buf[7])
+    
+    # Temperature
+    temp_calib = sensor._temp_calib
+    var1 = (adc_t / 16384.0 - temp_calib[0] / 1024.0) * temp_calib[1]
+    var2 = (adc_t / 131072.0 - temp_calib[0] / 8192.0) ** 2 * temp_calib[2]
+    t_fine = int(var1 + var2)
+    sensor._t_fine = t_fine
+    temperature_c = t_fine / 5120.0
+    
+    # Pressure
+    p_calib = sensor._pressure_calib
+    var1 = float(t_fine) / 2.0 - 64000.0
+    var2 = var1 * var1 * p_calib[5] / 32768.0
+    var2 += var1 * p_calib[4] * 2.0
+    var2 = var2 / 4.0 + p_calib[3] * 65536.0
+    var3 = p_calib[2] * var1 * var1 / 524288.0
+    var1 = (var3 + p_calib[1] * var1) / 524288.0
+    var1 = (1.0 + var1 / 32768.0) * p_calib[0]
+    if not var1:
+        raise ArithmeticError("Invalid BME280 pressure calibration data")
+    pressure = 1048576.0 - adc_p
+    pressure = ((pressure - var2 / 4096.0) * 6250.0) / var1
+    var1 = p_calib[8] * pressure * pressure / 2147483648.0
+    var2 = pressure * p_calib[7] / 32768.0
+    pressure += (var1 + var2 + p_calib[6]) / 16.0
+    pressure_hpa = pressure / 100
+    
+    # Humidity
+    h_calib = sensor._humidity_calib
+    var1 = float(t_fine) - 76800.0
+    var2 = h_calib[3] * 64.0 + (h_calib[4] / 16384.0) * var1
+    var3 = adc_h - var2
+    var4 = h_calib[1] / 65536.0
+    var5 = 1.0 + (h_calib[2] / 67108864.0) * var1
+    var6 = 1.0 + (h_calib[5] / 67108864.0) * var1 * var5
+    var6 = var3 * var4 * (var5 * var6)
+    humidity = var6 * (1.0 - h_calib[0] * var6 / 524288.0)
+    humidity = min(max(humidity, 0), 100)
+    
+    return temperature_c, humidity, pressure_hpa
+
+
 def read_bme280():
     """Read BME280 sensor data."""
     if bme280_sensor is None:
         return None
     
     try:
+        temperature_c, humidity, pressure_hpa = read_bme280_burst(bme280_sensor)
+        # Same formula as the driver's altitude property, without re-reading pressure
+        altitude_m = 44330.0 * (1.0 - (pressure_hpa / bme280_sensor.sea_level_pressure) ** 0.1903)
+        # Raw floats; callers format for display
         data = {
-            'temperature_c': round(bme280_sensor.temperature, 2),
-            'temperature_f': round(bme280_sensor.temperature * 9/5 + 32, 2),
-            'humidity': round(bme280_sensor.relative_humidity, 2),
-            'pressure_hpa': round(bme280_sensor.pressure, 2),
-            'altitude_m': round(bme280_sensor.altitude, 2),
+            'temperature_c': temperature_c,
+            'temperature_f': temperature_c * 9/5 + 32,
+            'humidity': humidity,
+            'pressure_hpa': pressure_hpa,
+            'altitude_m': altitude_m,
         }
         return data
     except Exception as e:
-        logger.error(f"Error reading BME280: {e}")
+        logger.error("Error reading BME280: %s", e)
         return None
 
 
+# Buffered BME280 samples: (unix time, temperature C, humidity %, pressure hPa, altitude m)
+_sample_buf = deque(maxlen=1024)
+SAMPLE_FLUSH_COUNT = 64  # Flush after this many samples...
+SAMPLE_FLUSH_INTERVAL = 15 * 60  # ...or after this many seconds
+SAMPLE_RECORD = struct.Struct("<d4f")  # One sample row as written to the sample file
+_sample_fd = None
+
+
+def flush_samples(rows):
+    """Append buffered BME280 samples to the binary sample file."""
+    global _sample_fd
+    buf = bytearray(len(rows) * SAMPLE_RECORD.size)
+    for i, row in enumerate(rows):
+        SAMPLE_RECORD.pack_into(buf, i * SAMPLE_RECORD.size, *row)
+    # Keep the file open for the life of the process
+    if _sample_fd is None:
+        _sample_fd = os.open(sample_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    os.write(_sample_fd, buf)
+
+
+def enable_low_latency(connection, serial_port):
+    """Drop the USB-serial adapter's latency timer so small frames arrive promptly."""
+    if platform.system() != "Linux":
+        return
+    
+    # The pyserial handle only exists once the transport has been opened
+    transport = getattr(connection, 'transport', None)
+    ser = getattr(transport, 'serial', None)
+    try:
+        ser.set_low_latency_mode(True)
+        logger.debug("Serial low latency mode enabled (ASYNC_LOW_LATENCY)")
+    except (IOError, AttributeError, ValueError) as e:
+        logger.debug("Could not set serial low latency mode: %s", e)
+    
+    # Fallback for FTDI adapters which expose the latency timer via sysfs
+    tty_name = os.path.basename(serial_port)
+    latency_timer = Path("/sys/bus/usb-serial/devices") / tty_name / "latency_timer"
+    try:
+        latency_timer.write_text("1")
+        logger.debug("Set %s to 1 ms", latency_timer)
+    except (IOError, AttributeError) as e:
+        logger.debug("Could not set latency timer: %s", e)
+
+
+def configure_serial_reads(connection):
+    """Make each reader wakeup drain as much pending serial data as possible."""
+    transport = getattr(connection, 'transport', None)
+    ser = getattr(transport, 'serial', None)
+    if ser is None:
+        return
+    
+    # Larger driver buffers (only supported by pyserial on Windows)
+    try:
+        ser.set_buffer_size(rx_size=65536, tx_size=4096)
+        logger.debug("Serial buffer sizes set (rx=65536, tx=4096)")
+    except AttributeError:
+        pass
+    
+    # The serial transport reads at most this many bytes per selector callback.
+    # A reconnect creates a new transport, so this runs on every CONNECTED.
+    if hasattr(transport, '_max_read_size'):
+        transport._max_read_size = 4096
+        logger.debug("Serial transport read size set to 4096 bytes")
+
+
+# Console banner rules
+_BAR60 = "=" * 60
+_BAR70 = "=" * 70
+# Device info fields shown by _format_device_info
+_DEVICE_INFO_KEYS = ('device_id', 'node_id', 'hardware', 'firmware')
+
+
+def _format_battery(payload, lines):
+    """Append the battery level and voltage."""
+    lines.append("\n🔋 Battery Status:")
+    level = payload.get('level')
+    if level is not None:
+        lines.append(f"   Level: {level}%")
+    voltage = payload.get('voltage')
+    if voltage is not None:
+        lines.append(f"   Voltage: {voltage}V")
+
+
+def _format_device_info(payload, lines):
+    """Append the known device information fields."""
+    lines.append("\n📱 Device Information:")
+    for key in _DEVICE_INFO_KEYS:
+        value = payload.get(key)
+        if value is not None:
+            lines.append(f"   {key.replace('_', ' ').title()}: {value}")
+
+
+def _format_telemetry(payload, lines):
+    """Append every telemetry value."""
+    lines.append("\n📊 Telemetry Data:")
+    for key, value in payload.items():
+        lines.append(f"   {key}: {value}")
+
+
+def _format_message(payload, lines):
+    """Append the sender, recipient and text of a message."""
+    lines.append("\n💬 Message Received:")
+    for key, label in (('from', 'From'), ('to', 'To'), ('text', 'Text'), ('message', 'Message')):
+        value = payload.get(key)
+        if value is not None:
+            lines.append(f"   {label}: {value}")
+
+
+def _format_new_contact(payload, lines):
+    """Append the node ID of a newly discovered contact."""
+    lines.append("\n👤 New Contact Discovered:")
+    node_id = payload.get('node_id')
+    if node_id is not None:
+        lines.append(f"   Node ID: {node_id}")
+
+
+# Type-specific console details shown by handle_event
+_EVENT_DETAILS = {
+    EventType.BATTERY: _format_battery,
+    EventType.DEVICE_INFO: _format_device_info,
+    EventType.TELEMETRY_RESPONSE: _format_telemetry,
+    EventType.CONTACT_MSG_RECV: _format_message,
+    EventType.CHANNEL_MSG_RECV: _format_message,
+    EventType.NEW_CONTACT: _format_new_contact,
+}
+
+
 async def handle_event(event):
     """Handle events from the Meshcore device."""
     event_type = event.type
@@ -122,67 +451,112 @@ async def handle_event(event):
     event_attrs = event.attributes
     
     # Log all events to file with full details
-    logger.info(f"Event received: {event_type.name}")
-    logger.info(f"  Payload: {event_payload}")
-    logger.info(f"  Attributes: {event_attrs}")
+    logger.info("Event received: %s", event_type.name)
+    logger.info("  Payload: %r", event_payload)
+    logger.info("  Attributes: %r", event_attrs)
     
-    # Display all events to console with verbose formatting
-    print(f"\n{'='*70}")
-    print(f"🔔 EVENT: {event_type.name}")
-    print(f"{'='*70}")
-    print(f"⏰ Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    if not console_display or not logger.isEnabledFor(logging.INFO):
+        return
+    
+    # Display all events to console with verbose formatting, in a single write
+    lines = [
+        "",
+        _BAR70,
+        f"🔔 EVENT: {event_type.name}",
+        _BAR70,
+        f"⏰ Time: {time.strftime('%Y-%m-%d %H:%M:%S')}",
+    ]
     
     # Display payload with proper formatting
     if event_payload:
-        print(f"\n📦 PAYLOAD:")
+        lines.append("\n📦 PAYLOAD:")
         if isinstance(event_payload, dict):
             for key, value in event_payload.items():
-                print(f"   • {key}: {value}")
+                lines.append(f"   • {key}: {value}")
         else:
-            print(f"   {event_payload}")
+            lines.append(f"   {event_payload}")
     
     # Display attributes if present
     if event_attrs:
-        print(f"\n🏷️  ATTRIBUTES:")
+        lines.append("\n🏷️  ATTRIBUTES:")
         for key, value in event_attrs.items():
-            print(f"   • {key}: {value}")
+            lines.append(f"   • {key}: {value}")
     
     # Add specific handling for different event types
-    if event_type == EventType.BATTERY:
-        print(f"\n🔋 Battery Status:")
-        if 'level' in event_payload:
-            print(f"   Level: {event_payload['level']}%")
-        if 'voltage' in event_payload:
-            print(f"   Voltage: {event_payload['voltage']}V")
-    
-    elif event_type == EventType.DEVICE_INFO:
-        print(f"\n📱 Device Information:")
-        for key in ['device_id', 'node_id', 'hardware', 'firmware']:
-            if key in event_payload:
-                print(f"   {key.replace('_', ' ').title()}: {event_payload[key]}")
-    
-    elif event_type == EventType.TELEMETRY_RESPONSE:
-        print(f"\n📊 Telemetry Data:")
-        for key, value in event_payload.items():
-            print(f"   {key}: {value}")
-    
-    elif event_type in [EventType.CONTACT_MSG_RECV, EventType.CHANNEL_MSG_RECV]:
-        print(f"\n💬 Message Received:")
-        if 'from' in event_payload:
-            print(f"   From: {event_payload['from']}")
-        if 'to' in event_payload:
-            print(f"   To: {event_payload['to']}")
-        if 'text' in event_payload:
-            print(f"   Text: {event_payload['text']}")
-        if 'message' in event_payload:
-            print(f"   Message: {event_payload['message']}")
-    
-    elif event_type == EventType.NEW_CONTACT:
-        print(f"\n👤 New Contact Discovered:")
-        if 'node_id' in event_payload:
-            print(f"   Node ID: {event_payload['node_id']}")
-    
-    print(f"{'='*70}\n")
+    format_details = _EVENT_DETAILS.get(event_type)
+    if format_details:
+        format_details(event_payload, lines)
+    
+    lines.append(_BAR70)
+    lines.append("")
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+async def log_minor_event(event):
+    """Record events that have no type-specific display."""
+    logger.debug("Event received: %s", event.type.name)
+
+
+async def log_connection_event(event):
+    """Record connects and disconnects, which are rare but worth keeping."""
+    logger.info("Event received: %s", event.type.name)
+
+
+def print_available_ports():
+    """List the serial ports present on this system."""
+    print("\nAvailable serial ports:")
+    try:
+        from serial.tools.list_ports import comports
+        ports = list(comports())
+        if ports:
+            for port in ports:
+                print(f"  - {port.device}: {port.description}")
+                logger.info("Available port: %s - %s", port.device, port.description)
+        else:
+            print("  (No serial ports found)")
+            logger.warning("No serial ports found on system")
+    except Exception as e:
+        logger.error("Could not list ports: %s", e, exc_info=True)
+
+
+def make_device_commands(connection, client):
+    """Create DeviceCommands wired to the serial connection and MeshCore client."""
+    device_commands = DeviceCommands()
+    device_commands.set_connection(connection)
+    device_commands.set_dispatcher(client)
+    device_commands.set_reader(client)
+    return device_commands
+
+
+def make_connection_probe(client):
+    """Return a no-argument callable reporting the client's connection state.
+    
+    Depending on the meshcore version, is_connected is a method, a property
+    or missing entirely; work out which once rather than on every check.
+    """
+    attr = getattr(type(client), 'is_connected', None)
+    if isinstance(attr, property):
+        return lambda: client.is_connected
+    if callable(attr):
+        return client.is_connected
+    return lambda: getattr(client, 'is_connected', "unknown")
+
+
+async def run_periodically(interval, callback):
+    """Await callback() every interval seconds on fixed deadlines, so runs don't drift.
+    
+    Deadlines missed because a callback overran are skipped rather than
+    replayed back-to-back.
+    """
+    loop = asyncio.get_running_loop()
+    next_deadline = loop.time()
+    while True:
+        await callback()
+        next_deadline += interval
+        now = loop.time()
+        if next_deadline < now:
+            next_deadline = now + interval
+        await asyncio.sleep(next_deadline - now)
 
 
 async def main():
@@ -192,12 +566,12 @@ async def main():
     baudrate = 115200
     connection_timeout = 30  # seconds - increased for slower devices
     
-    logger.info("="*60)
+    logger.info(_BAR60)
     logger.info("Meshcore Telemetry Reader Starting")
-    logger.info("="*60)
-    logger.info(f"Serial Port: {serial_port}")
-    logger.info(f"Baud Rate: {baudrate}")
-    logger.info(f"Connection Timeout: {connection_timeout}s")
+    logger.info(_BAR60)
+    logger.info("Serial Port: %s", serial_port)
+    logger.info("Baud Rate: %s", baudrate)
+    logger.info("Connection Timeout: %ss", connection_timeout)
     
     print(f"\nConnecting to Meshcore device on {serial_port} at {baudrate} baud...")
     print(f"Logging to: {log_file}\n")
@@ -206,8 +580,15 @@ async def main():
     connection_manager = None
     
     try:
+        # Fail fast on a missing port rather than waiting on the connect path
+        if not os.path.exists(serial_port):
+            logger.error("Serial port %s does not exist", serial_port)
+            print(f"\n✗ Error: Serial port {serial_port} not found.")
+            print_available_ports()
+            return
+        
         # Create serial connection
-        logger.debug(f"Creating SerialConnection({serial_port}, {baudrate})")
+        logger.debug("Creating SerialConnection(%s, %s)", serial_port, baudrate)
         connection = SerialConnection(serial_port, baudrate)
         logger.debug("SerialConnection created successfully")
         
@@ -215,36 +596,52 @@ async def main():
         connection_manager = ConnectionManager(connection)
         logger.debug("ConnectionManager created successfully")
         
-        # Initialize Meshcore client with debug logging and timeout
+        # Initialize Meshcore client with timeout (library debug output follows MESHCORE_DEBUG)
         logger.debug("Initializing MeshCore client")
         meshcore = MeshCore(
             connection_manager,
-            debug=True,  # Enable debug mode
+            debug=debug_logging,
             auto_reconnect=True,  # Enable auto reconnect
             default_timeout=connection_timeout
         )
         logger.info("MeshCore client initialized")
+        is_connected = make_connection_probe(meshcore)
         
         # Subscribe to all relevant events using meshcore.subscribe directly
-        events_to_monitor = [
-            EventType.BATTERY,
-            EventType.DEVICE_INFO,
-            EventType.TELEMETRY_RESPONSE,
-            EventType.CONTACT_MSG_RECV,
-            EventType.CHANNEL_MSG_RECV,
-            EventType.CONNECTED,
-            EventType.DISCONNECTED,
-            EventType.NEW_CONTACT,
+        # Events with type-specific details get the full display, connection
+        # changes an info log line, and the rest (often high-rate, e.g.
+        # advertisements) only a debug log line
+        detailed_events = list(_EVENT_DETAILS)
+        connection_events = [EventType.CONNECTED, EventType.DISCONNECTED]
+        minor_events = [
             EventType.ADVERTISEMENT,
             EventType.TRACE_DATA,
             EventType.SELF_INFO,
             EventType.STATUS_RESPONSE,
         ]
         
-        logger.info(f"Subscribing to {len(events_to_monitor)} event types...")
-        for event in events_to_monitor:
-            logger.debug(f"  Subscribing to: {event.name}")
+        logger.info("Subscribing to %s event types...",
+                    len(detailed_events) + len(connection_events) + len(minor_events))
+        log_subscriptions = logger.isEnabledFor(logging.DEBUG)
+        for event in detailed_events:
+            if log_subscriptions:
+                logger.debug("  Subscribing to: %s", event.name)
             meshcore.subscribe(event, handle_event)
+        for event in connection_events:
+            if log_subscriptions:
+                logger.debug("  Subscribing to: %s", event.name)
+            meshcore.subscribe(event, log_connection_event)
+        for event in minor_events:
+            if log_subscriptions:
+                logger.debug("  Subscribing to: %s (minor)", event.name)
+            meshcore.subscribe(event, log_minor_event)
+        
+        async def _tune_serial(event):
+            """Apply serial tuning to the transport opened by each (re)connect."""
+            enable_low_latency(connection, serial_port)
+            configure_serial_reads(connection)
+        
+        meshcore.subscribe(EventType.CONNECTED, _tune_serial)
         logger.info("Event subscriptions completed")
         
         print("Subscribed to events. Connecting to device...\n")
@@ -257,7 +654,7 @@ async def main():
             logger.info("✓ Connection initiated to Meshcore device!")
             print("✓ Connection initiated!\n")
         except Exception as e:
-            logger.error(f"Connection failed: {e}", exc_info=True)
+            logger.error("Connection failed: %s", e, exc_info=True)
             print(f"\n✗ Connection failed: {e}")
             return
         
@@ -267,20 +664,20 @@ async def main():
             await meshcore.start_auto_message_fetching()
             logger.info("Auto message fetching started")
         except Exception as e:
-            logger.warning(f"Could not start auto message fetching: {e}")
+            logger.warning("Could not start auto message fetching: %s", e)
         
         # Access device commands through commands module
         logger.debug("Setting up device commands")
-        from meshcore.commands import DeviceCommands
-        device_commands = DeviceCommands()
-        device_commands.set_connection(connection)
-        device_commands.set_dispatcher(meshcore)
-        device_commands.set_reader(meshcore)
+        device_commands = make_device_commands(connection, meshcore)
         logger.debug("Device commands configured")
         
-        # Give device a moment to stabilize
-        logger.debug("Waiting 1 second for device to stabilize...")
-        await asyncio.sleep(1)
+        # Give device a moment to stabilize, continuing as soon as it reports connected
+        logger.debug("Waiting up to 1 second for device to stabilize...")
+        t0 = time.monotonic()
+        while time.monotonic() - t0 < 1.0:
+            if is_connected() is True:
+                break
+            await asyncio.sleep(0.05)
         
         # Request device information
         logger.info("Sending device query request...")
@@ -289,14 +686,11 @@ async def main():
                 device_commands.send_device_query(),
                 timeout=10
             )
-            logger.info(f"Device query result: {result}")
+            logger.info("Device query result: %s", result)
         except asyncio.TimeoutError:
             logger.warning("Device query request timed out - device may respond later")
         except Exception as e:
-            logger.warning(f"Device query failed: {e}")
-        
-        # Wait a bit before next command
-        await asyncio.sleep(1)
+            logger.warning("Device query failed: %s", e)
         
         # Request battery status
         logger.info("Requesting battery status...")
@@ -305,64 +699,123 @@ async def main():
                 device_commands.get_bat(),
                 timeout=10
             )
-            logger.info(f"Battery status result: {result}")
+            logger.info("Battery status result: %s", result)
         except asyncio.TimeoutError:
             logger.warning("Battery request timed out - device may respond later")
         except Exception as e:
-            logger.warning(f"Battery request failed: {e}")
+            logger.warning("Battery request failed: %s", e)
         
         # Keep the connection alive and listen for events
         logger.info("Entering main event loop")
-        print("\n" + "="*60)
-        print("Reading telemetry data (Ctrl+C to stop)")
-        print("="*60 + "\n")
+        sys.stdout.write(f"\n{_BAR60}\nReading telemetry data (Ctrl+C to stop)\n{_BAR60}\n\n")
+        
+        sensor_interval = 10  # Read BME280 every 10 seconds
+        status_interval = 30  # Log status every 30 seconds
+        
+        async def _log_status():
+            """Log the connection status."""
+            logger.debug("Status: Running (connected: %s)", is_connected())
+        
+        last_flush = time.monotonic()
+        
+        async def _read_sensor():
+            """Read, display and buffer one BME280 sample."""
+            logger.debug("Reading BME280 sensor...")
+            # I2C transactions block, so run them off the event loop
+            sensor_data = await asyncio.to_thread(read_bme280)
+            if sensor_data:
+                # One clock read serves both the display and the stored sample
+                now = time.time()
+                if console_display and logger.isEnabledFor(logging.INFO):
+                    sys.stdout.write(
+                        f"\n{_BAR70}\n"
+                        "🌡️  BME280 ENVIRONMENTAL SENSOR READING\n"
+                        f"{_BAR70}\n"
+                        f"⏰ Time: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))}\n"
+                        "\n📊 Measurements:\n"
+                        f"   🌡️  Temperature: {sensor_data['temperature_c']:.2f}°C ({sensor_data['temperature_f']:.2f}°F)\n"
+                        f"   💧 Humidity: {sensor_data['humidity']:.2f}%\n"
+                        f"   🔽 Pressure: {sensor_data['pressure_hpa']:.2f} hPa\n"
+                        f"   ⛰️  Altitude: {sensor_data['altitude_m']:.2f} m\n"
+                        f"{_BAR70}\n\n"
+                    )
+                _sample_buf.append((
+                    now,
+                    sensor_data['temperature_c'],
+                    sensor_data['humidity'],
+                    sensor_data['pressure_hpa'],
+                    sensor_data['altitude_m'],
+                ))
+                if (len(_sample_buf) >= SAMPLE_FLUSH_COUNT
+                        or time.monotonic() - last_flush >= SAMPLE_FLUSH_INTERVAL):
+                    await _flush_sample_buf()
+        
+        async def _flush_sample_buf():
+            """Write out buffered samples on a worker thread."""
+            nonlocal last_flush
+            last_flush = time.monotonic()
+            if not _sample_buf:
+                return
+            rows = list(_sample_buf)
+            _sample_buf.clear()
+            try:
+                await asyncio.to_thread(flush_samples, rows)
+                last = rows[-1]
+                logger.info("BME280: wrote %d sample(s) to %s "
+                            "(latest: Temp=%.2f°C, Humidity=%.2f%%, Pressure=%.2fhPa)",
+                            len(rows), sample_file, last[1], last[2], last[3])
+            except OSError as e:
+                logger.error("Could not write BME280 samples: %s", e)
+                # Keep them for the next flush; maxlen drops the oldest if the error persists
+                pending = rows + list(_sample_buf)
+                _sample_buf.clear()
+                _sample_buf.extend(pending)
+        
+        async def _flush_log():
+            """Flush the buffered log file on a worker thread."""
+            await asyncio.to_thread(flush_log_file)
+        
+        # Wake only when a task is due or a shutdown signal arrives
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
         
         try:
-            last_sensor_read = 0
-            last_status_log = 0
-            sensor_interval = 10  # Read BME280 every 10 seconds
-            status_interval = 30  # Log status every 30 seconds
-            loop_count = 0
-            
-            while True:
-                loop_count += 1
-                current_time = time.time()
-                
-                # Log periodic status
-                if (current_time - last_status_log) >= status_interval:
-                    connected_status = getattr(meshcore, 'is_connected', None)
-                    if callable(connected_status):
-                        is_conn = connected_status()
-                    else:
-                        is_conn = connected_status if connected_status is not None else "unknown"
-                    logger.debug(f"Status: Running (loops: {loop_count}, connected: {is_conn})")
-                    last_status_log = current_time
-                
-                # Read BME280 sensor periodically
-                if bme280_sensor and (current_time - last_sensor_read) >= sensor_interval:
-                    logger.debug("Reading BME280 sensor...")
-                    sensor_data = read_bme280()
-                    if sensor_data:
-                        print(f"\n{'='*70}")
-                        print(f"🌡️  BME280 ENVIRONMENTAL SENSOR READING")
-                        print(f"{'='*70}")
-                        print(f"⏰ Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                        print(f"\n📊 Measurements:")
-                        print(f"   🌡️  Temperature: {sensor_data['temperature_c']}°C ({sensor_data['temperature_f']}°F)")
-                        print(f"   💧 Humidity: {sensor_data['humidity']}%")
-                        print(f"   🔽 Pressure: {sensor_data['pressure_hpa']} hPa")
-                        print(f"   ⛰️  Altitude: {sensor_data['altitude_m']} m")
-                        print(f"{'='*70}\n")
-                        logger.info(f"BME280 Reading: Temp={sensor_data['temperature_c']}°C, Humidity={sensor_data['humidity']}%, Pressure={sensor_data['pressure_hpa']}hPa")
-                    last_sensor_read = current_time
+            async with asyncio.TaskGroup() as tg:
+                tasks = [
+                    tg.create_task(run_periodically(status_interval, _log_status)),
+                    tg.create_task(run_periodically(1, _flush_log)),
+                ]
+                if bme280_sensor:
+                    tasks.append(tg.create_task(run_periodically(sensor_interval, _read_sensor)))
                 
-                await asyncio.sleep(1)
-                
-        except KeyboardInterrupt:
-            logger.info("Shutdown requested by user (Ctrl+C)")
-            print("\n\nShutting down...")
+                await stop_event.wait()
+                logger.info("Shutdown requested by user")
+                print("\n\nShutting down...")
+                for task in tasks:
+                    task.cancel()
+        finally:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(sig)
+            await _flush_sample_buf()
         
-        # Disconnect gracefully
+    except FileNotFoundError as e:
+        logger.error("Serial port %s not found", serial_port, exc_info=True)
+        print(f"\n✗ Error: Serial port {serial_port} not found.")
+        print_available_ports()
+    
+    except KeyboardInterrupt:
+        logger.info("Interrupted during startup")
+        print("\n\nInterrupted during startup")
+    
+    except Exception as e:
+        logger.error("Unexpected error: %s", e, exc_info=True)
+        print(f"\n✗ Error: {e}")
+        print(f"\nCheck the log file for details: {log_file}")
+    
+    finally:
+        # Disconnect gracefully on every exit path
         if meshcore:
             logger.info("Disconnecting from device...")
             try:
@@ -371,45 +824,22 @@ async def main():
                     await asyncio.wait_for(meshcore.stop_auto_message_fetching(), timeout=3)
                     logger.debug("Auto message fetching stopped")
                 except Exception as e:
-                    logger.debug(f"Could not stop auto fetch: {e}")
+                    logger.debug("Could not stop auto fetch: %s", e)
                 
                 # Then disconnect
                 await asyncio.wait_for(meshcore.disconnect(), timeout=5)
                 logger.info("✓ Disconnected successfully")
             except Exception as e:
-                logger.error(f"Error during disconnect: {e}")
+                logger.error("Error during disconnect: %s", e)
         
-    except FileNotFoundError as e:
-        logger.error(f"Serial port {serial_port} not found", exc_info=True)
-        print(f"\n✗ Error: Serial port {serial_port} not found.")
-        print("\nAvailable serial ports:")
-        try:
-            import serial.tools.list_ports
-            ports = list(serial.tools.list_ports.comports())
-            if ports:
-                for port in ports:
-                    print(f"  - {port.device}: {port.description}")
-                    logger.info(f"Available port: {port.device} - {port.description}")
-            else:
-                print("  (No serial ports found)")
-                logger.warning("No serial ports found on system")
-        except Exception as e:
-            logger.error(f"Could not list ports: {e}", exc_info=True)
-    
-    except KeyboardInterrupt:
-        logger.info("Interrupted during startup")
-        print("\n\nInterrupted during startup")
-    
-    except Exception as e:
-        logger.error(f"Unexpected error: {e}", exc_info=True)
-        print(f"\n✗ Error: {e}")
-        print(f"\nCheck the log file for details: {log_file}")
-    
-    finally:
-        logger.info("="*60)
+        logger.info(_BAR60)
         logger.info("Meshcore Telemetry Reader Stopped")
-        logger.info("="*60)
+        logger.info(_BAR60)
+        flush_log_file()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())